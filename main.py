@@ -1,11 +1,23 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import pyodbc
+import asyncio
+import httpx
+import lxml.html
+from selectolax.lexbor import LexborHTMLParser
+# Prefer Microsoft's mssql-python driver (no ODBC driver manager); its API
+# follows pyodbc's closely enough to fall back when it isn't installed
+try:
+    import mssql_python as dbapi
+except ImportError:
+    import pyodbc as dbapi
 import pandas as pd
-from urllib.parse import urljoin, urlparse
-import time
+from urllib.parse import urlparse
 import re
+import codecs
+import io
+import gzip
+import threading
+from collections import defaultdict
+from functools import lru_cache
 from datetime import datetime
 
 # LangChain imports for SQL Agent
@@ -21,13 +33,136 @@ load_dotenv()
 import os
 conn_str = os.getenv("SQL_CONN_STR")
 
+# Insert a scraped page, or refresh the existing row for the same url
+UPSERT_QUERY = """
+MERGE scraped_data WITH (HOLDLOCK) AS target
+USING (SELECT CAST(? AS NVARCHAR(MAX)) AS url,
+              CAST(? AS NVARCHAR(MAX)) AS title,
+              CAST(? AS NVARCHAR(MAX)) AS content) AS source
+ON target.url_hash = CONVERT(BINARY(32), HASHBYTES('SHA2_256', source.url))
+WHEN MATCHED THEN
+    UPDATE SET title = source.title, content = source.content, scraped_at = GETDATE()
+WHEN NOT MATCHED THEN
+    INSERT (url, title, content) VALUES (source.url, source.title, source.content);
+"""
+
+# Same upsert for a whole batch, passed as a dbo.ScrapeRows table-valued parameter
+UPSERT_TVP_QUERY = """
+MERGE scraped_data WITH (HOLDLOCK) AS target
+USING (SELECT url, title, content FROM ?) AS source
+ON target.url_hash = CONVERT(BINARY(32), HASHBYTES('SHA2_256', source.url))
+WHEN MATCHED THEN
+    UPDATE SET title = source.title, content = source.content, scraped_at = GETDATE()
+WHEN NOT MATCHED THEN
+    INSERT (url, title, content) VALUES (source.url, source.title, source.content);
+"""
+
+# Number of scraped pages written to the database per INSERT batch
+SAVE_BATCH_SIZE = 10
+
+# Number of rows pulled per fetch when reading scraped data back
+FETCH_BATCH_SIZE = 10_000
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Most bytes read from any page body; far more than the stored 5000 chars need
+MAX_PAGE_BYTES = 1_000_000
+
+# Approximate number of progress bar refreshes per scrape
+PROGRESS_UPDATES = 20
+
+# Concurrency limits for page fetches: open connections overall, and
+# in-flight requests allowed against any single host
+MAX_CONNECTIONS = 16
+MAX_REQUESTS_PER_HOST = 4
+
+# Collapses runs of whitespace in extracted page text
+_WS_RE = re.compile(r'\s+')
+
+# charset declared in a page's <meta> tag
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+
+# Driver={...} entry of an ODBC connection string
+_DRIVER_KEYWORD_RE = re.compile(r'(?i)(?:^|(?<=;))\s*driver\s*=\s*(?:\{[^}]*\}|[^;]*);?')
+
+# Number of previous Q/A turns passed to the SQL agent as context
+CHAT_MEMORY_TURNS = 3
+
+
+
+def direct_conn_str(odbc_conn_str):
+    """Adapt SQL_CONN_STR for the direct driver.
+    
+    mssql-python chooses its own driver and rejects a Driver= keyword, while
+    the pyodbc URI used by the SQL agent needs it, so it is stripped here only.
+    """
+    if dbapi.__name__ != 'mssql_python':
+        return odbc_conn_str
+    return _DRIVER_KEYWORD_RE.sub('', odbc_conn_str)
+
+@st.cache_resource(show_spinner=False)
+def _connect():
+    """Open the database connection shared across reruns and sessions"""
+    return dbapi.connect(direct_conn_str(conn_str), autocommit=False)
+
+@st.cache_resource(show_spinner=False)
+def _db_lock():
+    """Lock serializing transactions on the shared connection across sessions"""
+    return threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def _tvp_state():
+    """Whether batch upserts may use table-valued parameters (a pyodbc feature).
+    
+    Cached rather than a module global so it survives script reruns.
+    """
+    return {'enabled': dbapi.__name__ == 'pyodbc'}
+
+def _tvp_unsupported(error):
+    """Whether error means table-valued parameters cannot work here, not a transient failure"""
+    if isinstance(error, dbapi.NotSupportedError):
+        return True
+    # Missing dbo.ScrapeRows type, or the ODBC driver rejecting the TVP binding
+    return any(marker in str(error) for marker in ('ScrapeRows', 'HYC00', 'HY004'))
+
+def _reconnect(conn):
+    """Drop a broken shared connection so the next _connect() opens a fresh one"""
+    _connect.clear()
+    try:
+        conn.close()
+    except dbapi.Error:
+        pass
+
+def run_db(work):
+    """Run work(cursor) in one transaction on the shared connection and return its result.
+    
+    Sessions take turns through _db_lock so their transactions never interleave.
+    If the connection has dropped, it is reopened and work is retried once.
+    """
+    with _db_lock():
+        for attempt in range(2):
+            conn = _connect()
+            try:
+                cursor = conn.cursor()
+                try:
+                    result = work(cursor)
+                finally:
+                    cursor.close()
+                conn.commit()
+                return result
+            except (dbapi.OperationalError, dbapi.InterfaceError):
+                _reconnect(conn)
+                if attempt:
+                    raise
+            except Exception:
+                conn.rollback()
+                raise
 
 def create_database_table():
     """Create the scraped_data table if it doesn't exist"""
     try:
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
-        
         create_table_query = """
         IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='scraped_data' AND xtype='U')
         CREATE TABLE scraped_data (
@@ -38,107 +173,300 @@ def create_database_table():
             scraped_at DATETIME DEFAULT GETDATE()
         )
         """
-        cursor.execute(create_table_query)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        
+        # Hash of url for uniqueness; NVARCHAR(MAX) columns cannot be index keys
+        add_url_hash_query = """
+        IF COL_LENGTH('scraped_data', 'url_hash') IS NULL
+        ALTER TABLE scraped_data
+            ADD url_hash AS CONVERT(BINARY(32), HASHBYTES('SHA2_256', url)) PERSISTED
+        """
+        
+        # Drop older duplicates of a url before enforcing uniqueness on it
+        create_indexes_query = """
+        IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_scraped_url')
+        BEGIN
+            ;WITH ranked AS (
+                SELECT ROW_NUMBER() OVER (
+                    PARTITION BY url_hash ORDER BY scraped_at DESC, id DESC
+                ) AS rn
+                FROM scraped_data
+            )
+            DELETE FROM ranked WHERE rn > 1;
+            CREATE UNIQUE INDEX ix_scraped_url ON scraped_data(url_hash);
+        END
+        IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_scraped_time')
+            CREATE INDEX ix_scraped_time ON scraped_data(scraped_at DESC);
+        """
+        
+        # Table type for passing a whole batch of rows as one parameter
+        create_row_type_query = """
+        IF TYPE_ID('dbo.ScrapeRows') IS NULL
+        CREATE TYPE dbo.ScrapeRows AS TABLE (
+            url NVARCHAR(MAX),
+            title NVARCHAR(MAX),
+            content NVARCHAR(MAX)
+        )
+        """
+        def create(cursor):
+            cursor.execute(create_table_query)
+            cursor.execute(add_url_hash_query)
+            cursor.execute(create_indexes_query)
+            cursor.execute(create_row_type_query)
+        
+        run_db(create)
         return True
     except Exception as e:
         st.error(f"Database table creation error: {str(e)}")
         return False
 
+@lru_cache(maxsize=4096)
+def url_netloc(url):
+    """Return the network location of url, memoized for repeated lookups"""
+    return urlparse(url).netloc
+
 def get_page_links(base_url, max_pages):
     """Extract links from the base URL to scrape multiple pages"""
     try:
-        response = requests.get(base_url, timeout=10)
+        response = httpx.get(base_url, headers=HEADERS, timeout=10, follow_redirects=True)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Parse with the header or <meta> charset so non-ASCII hrefs aren't read as Latin-1
+        encoding = known_charset(response.charset_encoding) or sniff_charset(response.content)
+        root = lxml.html.fromstring(response.content, parser=lxml.html.HTMLParser(encoding=encoding))
+        root.make_links_absolute(base_url, handle_failures='discard')
         
-        links = []
-        links.append(base_url)  # Include the base URL itself
+        links = [base_url]  # Include the base URL itself
+        seen = {base_url}
+        base_netloc = url_netloc(base_url)
         
         # Find all links on the page
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            full_url = urljoin(base_url, href)
+        for href in root.xpath('//a/@href'):
+            full_url = str(href)
             
-            # Check if it's a valid URL from the same domain
-            if urlparse(full_url).netloc == urlparse(base_url).netloc:
-                if full_url not in links:
-                    links.append(full_url)
-                    
-                if len(links) >= max_pages:
-                    break
+            # Keep new URLs from the same domain only
+            if full_url in seen or url_netloc(full_url) != base_netloc:
+                continue
+            seen.add(full_url)
+            links.append(full_url)
+            
+            if len(links) >= max_pages:
+                break
         
         return links[:max_pages]
     except Exception as e:
         st.error(f"Error getting page links: {str(e)}")
         return [base_url]
 
-def scrape_page(url):
-    """Scrape content from a single page"""
+def sniff_charset(body):
+    """Return the charset declared by a page's <meta> tag, defaulting to UTF-8"""
+    match = _META_CHARSET_RE.search(body[:4096])
+    return (match and known_charset(match.group(1).decode('ascii'))) or 'utf-8'
+
+def known_charset(name):
+    """Return the normalized codec name for charset name, or None if Python doesn't know it"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        return codecs.lookup(name).name if name else None
+    except LookupError:
+        return None
+
+def extract_text_lxml(body, encoding=None):
+    """Extract (title, text) from an HTML document with lxml.
+    
+    The body is decoded in Python, with encoding or else the <meta> charset,
+    and handed to libxml2 as UTF-8, so lxml never falls back to reading
+    undeclared bytes as Latin-1.
+    """
+    utf8_body = body.decode(encoding or sniff_charset(body), errors='replace').encode('utf-8')
+    root = lxml.html.fromstring(utf8_body, parser=lxml.html.HTMLParser(encoding='utf-8'))
+    
+    # Extract title
+    title_text = (root.findtext('.//title') or "No Title").strip()
+    
+    # Remove script and style elements
+    for bad in root.xpath('//script|//style'):
+        bad.drop_tree()  # keeps the element's tail text
+    
+    return title_text, root.text_content()
+
+def extract_text(body, encoding=None):
+    """Extract (title, text) from an HTML document, using selectolax with an lxml fallback.
+    
+    encoding is the charset from the HTTP Content-Type header; without it the
+    parser sniffs the BOM and <meta> charset instead.
+    """
+    encoding = known_charset(encoding)
+    try:
+        if encoding:
+            tree = LexborHTMLParser(body.decode(encoding, errors='replace'))
+        else:
+            tree = LexborHTMLParser(body, encoding=True)
+        if tree.body is None:
+            return extract_text_lxml(body, encoding)
         
         # Extract title
-        title = soup.find('title')
-        title_text = title.get_text().strip() if title else "No Title"
+        title_node = tree.css_first('title')
+        title_text = title_node.text(strip=True) if title_node else "No Title"
         
         # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
+        for node in tree.css('script, style'):
+            node.decompose()
         
-        # Extract text content
-        content = soup.get_text()
-        
-        # Clean up the text
-        lines = (line.strip() for line in content.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        content_text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return {
-            'url': url,
-            'title': title_text,
-            'content': content_text[:5000]  # Limit content length
-        }
-    except Exception as e:
-        st.error(f"Error scraping {url}: {str(e)}")
-        return None
+        return title_text, tree.body.text(separator=' ')
+    except Exception:
+        return extract_text_lxml(body, encoding)
 
-def save_to_database(data):
-    """Save scraped data to MSSQL database"""
-    try:
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
+def parse_page(url, body, encoding=None):
+    """Build the scraped record for a downloaded page"""
+    title_text, content = extract_text(body, encoding)
+    
+    # Collapse whitespace, bounding the regex work on huge pages
+    content_text = _WS_RE.sub(' ', content[:50_000]).strip()
+    
+    return {
+        'url': url,
+        'title': title_text,
+        'content': content_text[:5000]  # Limit content length
+    }
+
+async def fetch_page(client, semaphore, url):
+    """Download a page, reading at most MAX_PAGE_BYTES of its body.
+    
+    Returns the body and the charset from its Content-Type header, if any.
+    """
+    body = bytearray()
+    async with semaphore:
+        async with client.stream('GET', url) as response:
+            response.raise_for_status()
+            encoding = response.charset_encoding
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= MAX_PAGE_BYTES:
+                    break
+    return bytes(body[:MAX_PAGE_BYTES]), encoding
+
+async def scrape_page(client, semaphore, url):
+    """Scrape content from a single page.
+    
+    Parsing runs in the default executor so it overlaps with other downloads.
+    Errors are raised to the caller.
+    """
+    body, encoding = await fetch_page(client, semaphore, url)
+    return await asyncio.get_running_loop().run_in_executor(None, parse_page, url, body, encoding)
+
+async def run_scrape(links, progress_bar, status_text):
+    """Scrape links concurrently, saving pages in batches.
+    
+    Returns the number of pages saved and a log with one row per link.
+    Progress widgets are refreshed about PROGRESS_UPDATES times in total.
+    """
+    host_semaphores = defaultdict(lambda: asyncio.Semaphore(MAX_REQUESTS_PER_HOST))
+    
+    async def scrape(link):
+        try:
+            semaphore = host_semaphores[url_netloc(link)]
+            return link, await scrape_page(client, semaphore, link), None
+        except Exception as e:
+            return link, None, e
+    
+    scraped_count = 0
+    scrape_log = []
+    pending = []
+    update_every = max(1, len(links) // PROGRESS_UPDATES)
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=10,
+        headers=HEADERS,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
+    ) as client:
+        for i, result in enumerate(asyncio.as_completed([scrape(link) for link in links])):
+            link, data, error = await result
+            
+            if error:
+                scrape_log.append({'URL': link, 'Title': '', 'Status': f"❌ {error}"})
+            elif data:
+                entry = {'URL': link, 'Title': data['title'], 'Status': "✅ Saved"}
+                scrape_log.append(entry)
+                pending.append((data, entry))
+            
+            # Save to database
+            done = i + 1 == len(links)
+            if len(pending) >= SAVE_BATCH_SIZE or (done and pending):
+                # The driver call blocks, so run it off the event loop to keep downloads moving
+                try:
+                    await asyncio.to_thread(save_many_to_database, [data for data, _ in pending])
+                    _read_scraped_data.clear()
+                    scraped_count += len(pending)
+                except Exception as e:
+                    st.error(f"Database save error: {str(e)}")
+                    for _, entry in pending:
+                        entry['Status'] = "❌ Failed to save"
+                pending = []
+            
+            # Update progress
+            if done or i % update_every == 0:
+                status_text.text(f"Scraped page {i+1}/{len(links)}: {link}")
+                progress_bar.progress((i + 1) / len(links))
+    
+    return scraped_count, scrape_log
+
+def save_many_to_database(rows):
+    """Save a batch of scraped pages to MSSQL database in one round-trip.
+    
+    The batch goes up as a single table-valued parameter; if the server
+    rejects that, rows are sent with fast_executemany instead. Makes no
+    Streamlit calls, so it can run off the script thread; errors are raised.
+    """
+    if not rows:
+        return
+    # MERGE may touch each target row only once, so keep the last row per url
+    params = [(r['url'], r['title'], r['content']) for r in {r['url']: r for r in rows}.values()]
+    tvp = _tvp_state()
+    if tvp['enabled']:
+        try:
+            run_db(lambda cursor: cursor.execute(UPSERT_TVP_QUERY, (['ScrapeRows', 'dbo', *params],)))
+            return
+        except dbapi.Error as e:
+            # Stop trying TVPs only when they can never work; otherwise just retry this batch
+            if _tvp_unsupported(e):
+                tvp['enabled'] = False
+    
+    def upsert(cursor):
+        cursor.fast_executemany = True  # pyodbc only; mssql-python batches natively
+        cursor.executemany(UPSERT_QUERY, params)
+    
+    run_db(upsert)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _read_scraped_data(full_content):
+    """Query scraped rows, cached until the next write or for 60 seconds"""
+    content_column = "content" if full_content else "LEFT(content, 500) AS content_preview"
+    query = (
+        f"SELECT id, url, title, scraped_at, {content_column} "
+        "FROM scraped_data ORDER BY scraped_at DESC"
+    )
+    
+    def read(cursor):
+        cursor.execute(query)
+        columns = [column[0] for column in cursor.description]
         
-        insert_query = """
-        INSERT INTO scraped_data (url, title, content)
-        VALUES (?, ?, ?)
-        """
+        # Build the frame in chunks so the raw rows never sit in memory all at once
+        frames = []
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            frames.append(pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns))
         
-        cursor.execute(insert_query, (data['url'], data['title'], data['content']))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True
-    except Exception as e:
-        st.error(f"Database save error: {str(e)}")
-        return False
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+    
+    return run_db(read)
 
-def get_scraped_data():
-    """Retrieve scraped data from database"""
+def get_scraped_data(full_content=False):
+    """Retrieve scraped data from database, with a content preview unless full_content is set"""
     try:
-        conn = pyodbc.connect(conn_str)
-        query = "SELECT * FROM scraped_data ORDER BY scraped_at DESC"
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df
+        return _read_scraped_data(full_content)
     except Exception as e:
         st.error(f"Database retrieval error: {str(e)}")
         return pd.DataFrame()
@@ -147,30 +475,80 @@ def clear_database(u):
     """Clear all data from the database or specific url"""
     # print(f"deleting data from {u}")
     try:
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
-        cursor.execute(f'DELETE FROM scraped_data WHERE url LIKE \'{u}%\'')
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Match u as a literal prefix: bracket-escape LIKE wildcards before appending %
+        prefix = u.replace('[', '[[]').replace('%', '[%]').replace('_', '[_]')
+        run_db(lambda cursor: cursor.execute("DELETE FROM scraped_data WHERE url LIKE ?", (prefix + '%',)))
+        _read_scraped_data.clear()
 
         return True
     except Exception as e:
         st.error(f"Database clear error: {str(e)}")
         return False
 
-def agent_sql_tool(user_text, api_key):
+@st.cache_data(ttl=60, show_spinner=False)
+def _csv_gz(df_hash, _df):
+    """Gzip-compressed CSV of _df, memoized on df_hash so reruns reuse it"""
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=5) as gz:
+        with io.TextIOWrapper(gz, encoding='utf-8', newline='') as text:
+            _df.to_csv(text, index=False)
+    return buf.getvalue()
+
+@st.cache_resource(show_spinner=False)
+def _build_agent(api_key):
+    """Build the SQL agent once per API key; schema reflection happens here"""
+    # Initialize LLM with user-provided API key
+    llm = ChatGroq(api_key=api_key, model_name="llama3-8b-8192")
+
+    # Setup LangChain database and agent with the same connection string; SQLAlchemy
+    # has no mssql-python dialect yet, so the agent still connects through pyodbc
+    db = SQLDatabase.from_uri(
+        f"mssql+pyodbc:///?odbc_connect={conn_str}",
+        sample_rows_in_table_info=2,
+    )
+    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+    return create_sql_agent(llm=llm, toolkit=toolkit, verbose=False)
+
+def with_chat_context(user_text, history):
+    """Prefix the question with the last few Q/A turns so follow-ups resolve.
+    
+    The context goes into the agent's input rather than its system prompt,
+    which keeps the static prompt identical across turns.
+    """
+    recent = history[-CHAT_MEMORY_TURNS:]
+    if not recent:
+        return user_text
+    turns = "\n".join(f"Q: {question}\nA: {answer}" for question, answer in recent)
+    return f"Previous conversation:\n{turns}\n\nCurrent question: {user_text}"
+
+def has_scraped_data():
+    """Check whether the scraped_data table holds any rows"""
+    def probe(cursor):
+        cursor.execute("SELECT TOP 1 1 FROM scraped_data")
+        return cursor.fetchone() is not None
+    
+    return run_db(probe)
+
+def agent_sql_tool(user_text, api_key, history=()):
     """SQL Agent tool to query scraped data"""
     try:
-        # Initialize LLM with user-provided API key
-        llm = ChatGroq(api_key=api_key, model_name="llama3-8b-8192")
-
-        # Setup LangChain database and agent with the same connection string
-        db = SQLDatabase.from_uri(f"mssql+pyodbc:///?odbc_connect={conn_str}")
-        toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-        agent_executor = create_sql_agent(llm=llm, toolkit=toolkit, verbose=True)
+        # Skip the LLM entirely when there is nothing to query
+        if not has_scraped_data():
+            return "The database is empty; scrape some pages first."
+        
+        agent_input = with_chat_context(user_text, list(history))
         
-        return agent_executor.run(user_text)
+        # Stream agent steps so the UI shows progress while the answer is produced
+        placeholder = st.empty()
+        output = []
+        for chunk in _build_agent(api_key).stream({"input": agent_input}):
+            for action in chunk.get("actions", []):
+                placeholder.markdown(f"🔧 Running `{action.tool}`...")
+            if chunk.get("output"):
+                output.append(chunk["output"])
+                placeholder.markdown("".join(output))
+        placeholder.empty()
+        return "".join(output)
     except Exception as e:
         st.error(f"Agent error: {str(e)}")
         return None
@@ -251,27 +629,8 @@ def main():
             
             st.success(f"Found {len(links)} pages to scrape")
             
-            # Scrape each page
-            scraped_count = 0
-            for i, link in enumerate(links):
-                status_text.text(f"Scraping page {i+1}/{len(links)}: {link}")
-                
-                # Scrape the page
-                data = scrape_page(link)
-                
-                if data:
-                    # Save to database
-                    if save_to_database(data):
-                        scraped_count += 1
-                        st.success(f"✅ Scraped and saved: {data['title']}")
-                    else:
-                        st.error(f"❌ Failed to save: {link}")
-                
-                # Update progress
-                progress_bar.progress((i + 1) / len(links))
-                
-                # Add delay to be respectful to the server
-                time.sleep(1)
+            # Scrape pages concurrently, flushing rows to the database in batches
+            scraped_count, scrape_log = asyncio.run(run_scrape(links, progress_bar, status_text))
             
             status_text.text("Scraping completed!")
             st.success(f"🎉 Successfully scraped {scraped_count} out of {len(links)} pages!")
@@ -285,23 +644,32 @@ def main():
                 st.metric("Successfully Scraped", scraped_count)
             with col3:
                 st.metric("Success Rate", f"{(scraped_count/len(links)*100):.1f}%")
+            
+            st.dataframe(pd.DataFrame(scrape_log), use_container_width=True)
         
-        # View scraped data
+        # View scraped data; kept open across reruns so the export button below works
         if view_data_button:
+            st.session_state.show_scraped_data = True
+        elif scrape_button or clear_data_button:
+            st.session_state.show_scraped_data = False
+        
+        if st.session_state.get('show_scraped_data'):
             st.markdown("### 📊 Scraped Data from Database")
             df = get_scraped_data()
             
             if not df.empty:
                 st.dataframe(df, use_container_width=True)
                 
-                # Download option
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download as CSV",
-                    data=csv,
-                    file_name=f"scraped_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
+                # Download option; full page content is only loaded when asked for
+                if st.button("📦 Prepare CSV export"):
+                    export_df = get_scraped_data(full_content=True)
+                    export_hash = int(pd.util.hash_pandas_object(export_df).sum())
+                    st.download_button(
+                        label="📥 Download as CSV (gzip)",
+                        data=_csv_gz(export_hash, export_df),
+                        file_name=f"scraped_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv.gz",
+                        mime="application/gzip"
+                    )
             else:
                 st.info("No data found in the database. Start scraping to see data here.")
         
@@ -330,7 +698,7 @@ def main():
             - Stores data in MSSQL Server database
             - Progress tracking with visual feedback
             - Export data to CSV format
-            - Respectful scraping with delays
+            - Concurrent scraping with per-host request limits
             - Error handling and validation
             """)
     
@@ -366,7 +734,8 @@ def main():
             if ask_button and user_question:
                 with st.spinner("🧠 AI is thinking..."):
                     try:
-                        response = agent_sql_tool(user_question, user_api_key)
+                        response = agent_sql_tool(user_question, user_api_key,
+                                                  st.session_state.chat_history)
                         if response:
                             # Add to chat history
                             st.session_state.chat_history.append((user_question, response))